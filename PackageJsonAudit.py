@@ -1,7 +1,13 @@
 # Python script to build a dependency graph of package-lock.json includes
 
-import argparse, pathlib, os, os.path, json, sqlite3
-import graphviz
+import argparse, functools, pathlib, json, sqlite3
+import graphviz, ijson
+
+# orjson is an optional faster parser, fall back to the standard library when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 ###########
 ## Logic ##
@@ -23,78 +29,126 @@ def load_args():
 ## Database functions ##
 ########################
 
+# Insert statements, kept constant so sqlite3 reuses the prepared statements from its cache
+_INSERT_PACKAGE_SQL = 'INSERT OR IGNORE INTO packages (name, version, file, fileSection) VALUES (?, ?, ?, ?)'
+_INSERT_DEPENDENCY_SQL = 'INSERT OR IGNORE INTO dependencies VALUES (?, ?, ?, ?)'
+
 def init_database(output_path: str) -> sqlite3.Connection:
     """
     Initialize SQLite database
     """
-    absolute_path = os.path.abspath(output_path)
+    database_file = pathlib.Path(output_path).absolute()
 
     # Remove existint database file for overwrite
-    if os.path.exists(absolute_path):
-        os.remove(absolute_path)
+    database_file.unlink(missing_ok=True)
 
     # Create directory path if non existant
-    directory_path = os.path.dirname(absolute_path)
-    if not os.path.exists(directory_path):
-        os.makedirs(directory_path)
+    database_file.parent.mkdir(parents=True, exist_ok=True)
 
     # Initialize SQLite database file and schema
-    connection = sqlite3.connect(absolute_path)
+    connection = sqlite3.connect(database_file, cached_statements=256)
 
-    cur = connection.cursor()
+    # Pragmas favour import speed over durability, the database is rebuilt from scratch on every run
+    connection.executescript('''
+    PRAGMA journal_mode=MEMORY;
+    PRAGMA synchronous=OFF;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
 
-    cur.execute('CREATE TABLE packages (id integer PRIMARY KEY NOT NULL, name text NOT NULL, version text NOT NULL, file text NOT NULL, fileSection text NOT NULL, UNIQUE(name, version, fileSection))')
-    cur.execute('''CREATE TABLE dependencies 
+    CREATE TABLE packages (id integer PRIMARY KEY NOT NULL, name text NOT NULL, version text NOT NULL, file text NOT NULL, fileSection text NOT NULL, UNIQUE(name, version, fileSection));
+    CREATE TABLE dependencies 
     (parentName text, parentVersion text, childName text, childVersion text, 
     FOREIGN KEY(parentName) REFERENCES package(name), 
     FOREIGN KEY(parentVersion) REFERENCES package(version), 
     FOREIGN KEY(childName) REFERENCES package(name), 
     FOREIGN KEY(childVersion) REFERENCES package(version),
-    UNIQUE(parentName, parentVersion, childName, childVersion))''')
-
-    connection.commit()
+    UNIQUE(parentName, parentVersion, childName, childVersion));
+    ''')
 
     return connection
 
-def database_add_package(db_cursor: sqlite3.Cursor, package_name: str, package_version: str, file: str, file_section: str):
+def database_create_indexes(db_connection: sqlite3.Connection):
+    """
+    Index the populated database for the GraphViz queries
+    """
+    # Lookups on (name, version) and (parentName, parentVersion) are already served by the UNIQUE constraint indexes
+    db_connection.executescript('''
+    CREATE INDEX idx_pkg_file_name_version ON packages(file, name, version);
+    CREATE INDEX idx_dep_child ON dependencies(childName, childVersion);
+    ANALYZE;
+    ''')
+
+def database_add_packages(db_connection: sqlite3.Connection, package_rows: 'list[tuple[str, str, str, str]]'):
     """
-    Insert package information into database
+    Batch insert package information into database
     """
-    db_cursor.execute('INSERT OR IGNORE INTO packages (name, version, file, fileSection) VALUES (?, ?, ?, ?)', (package_name, package_version, file, file_section))
+    # Drop duplicate rows before handing them to SQLite
+    db_connection.executemany(_INSERT_PACKAGE_SQL, dict.fromkeys(package_rows))
 
-def database_add_dependency(db_cursor: sqlite3.Cursor, parent_package_name: str, parent_package_version: str, child_package_name: str, child_package_version: str):
+def database_add_dependencies(db_connection: sqlite3.Connection, dependency_rows: 'list[tuple[str, str, str, str]]'):
     """
-    Add dependency information to database
+    Batch insert dependency information into database
     """
-    db_cursor.execute('INSERT OR IGNORE INTO dependencies VALUES (?, ?, ?, ?)', (parent_package_name, parent_package_version, child_package_name, child_package_version))
+    db_connection.executemany(_INSERT_DEPENDENCY_SQL, dict.fromkeys(dependency_rows))
 
 ###########################
 ## JSON import functions ##
 ###########################
 
-def import_package_dependencies(db_cursor: sqlite3.Cursor, package_name: str, package_version: str, package_json_node, source_file: str, file_section: str):
+# Row count at which collected rows are flushed to the database during import
+_IMPORT_BATCH_SIZE = 10000
+
+def load_json_file(json_file: pathlib.Path):
+    """
+    Loads a json file, using orjson when available
+    """
+    if orjson is not None:
+        return orjson.loads(json_file.read_bytes())
+
+    with json_file.open('rb') as json_stream:
+        return json.load(json_stream)
+
+def import_package_dependencies(package_rows: list, dependency_rows: list, visited: 'set[tuple[str, str]]', package_name: str, package_version: str, package_json_node, source_file: str, file_section: str):
     """
-    Imports `requires` and `dependencies` fields of provided json object into database
+    Collects `requires` and `dependencies` fields of provided json object into package and dependency row lists
     """
 
-    if 'dependencies' in package_json_node:
-        for dependency_name in package_json_node['dependencies']:
-            dependency_json = package_json_node['dependencies'][dependency_name]
-            dependency_version = dependency_json['version']
+    # Walk the tree with an explicit stack, deep lock files can exceed the recursion limit
+    package_stack = [(package_name, package_version, package_json_node)]
 
-            database_add_package(db_cursor, dependency_name, dependency_version, source_file, file_section)
-            database_add_dependency(db_cursor, package_name, package_version, dependency_name, dependency_version)
+    while package_stack:
+        package_name, package_version, package_json_node = package_stack.pop()
 
-            import_package_dependencies(db_cursor, dependency_name, dependency_version, dependency_json, source_file, file_section)
+        # Nested dependencies depend on where a package sits in the lock file, so only packages
+        # without any are skipped on repeat visits, their `requires` are the same everywhere
+        if 'dependencies' not in package_json_node:
+            package_key = (package_name, package_version)
+            if package_key in visited:
+                continue
+            visited.add(package_key)
 
-    if 'requires' in package_json_node:
-        for requirement_name in package_json_node['requires']:
-            requirement_version = package_json_node['requires'][requirement_name]
+        if 'dependencies' in package_json_node:
+            child_nodes = []
+            for dependency_name in package_json_node['dependencies']:
+                dependency_json = package_json_node['dependencies'][dependency_name]
+                dependency_version = dependency_json['version']
 
-            database_add_package(db_cursor, requirement_name, requirement_version, source_file, file_section)
-            database_add_dependency(db_cursor, package_name, package_version, requirement_name, requirement_version)
+                package_rows.append((dependency_name, dependency_version, source_file, file_section))
+                dependency_rows.append((package_name, package_version, dependency_name, dependency_version))
 
-def import_json_dependency_section(db_cursor: sqlite3.Cursor, package_json, filename: str, section_name: str):
+                child_nodes.append((dependency_name, dependency_version, dependency_json))
+
+            # Push in reverse so children are walked in the same order as the lock file
+            package_stack.extend(reversed(child_nodes))
+
+        if 'requires' in package_json_node:
+            for requirement_name in package_json_node['requires']:
+                requirement_version = package_json_node['requires'][requirement_name]
+
+                package_rows.append((requirement_name, requirement_version, source_file, file_section))
+                dependency_rows.append((package_name, package_version, requirement_name, requirement_version))
+
+def import_json_dependency_section(db_connection: sqlite3.Connection, package_json, filename: str, section_name: str):
     """
     Imports named section of a json file into the database
     """
@@ -102,8 +156,19 @@ def import_json_dependency_section(db_cursor: sqlite3.Cursor, package_json, file
         print(f'Section \"{section_name}\" not found in package, skipping')
         return
 
-    for dependency_name in package_json[section_name]:
-        dependency_json = package_json[section_name][dependency_name]
+    import_dependency_items(db_connection, package_json[section_name].items(), filename, section_name)
+
+def import_dependency_items(db_connection: sqlite3.Connection, dependency_items, filename: str, section_name: str) -> int:
+    """
+    Imports (name, json) pairs of a dependency section into the database, returning the number of pairs imported
+    """
+    item_count = 0
+    package_rows: 'list[tuple[str, str, str, str]]' = []
+    dependency_rows: 'list[tuple[str, str, str, str]]' = []
+    visited: 'set[tuple[str, str]]' = set()
+
+    for dependency_name, dependency_json in dependency_items:
+        item_count += 1
         dependency_version: str
 
         if 'version' in dependency_json:
@@ -111,87 +176,114 @@ def import_json_dependency_section(db_cursor: sqlite3.Cursor, package_json, file
         else:
             dependency_version = dependency_json # The section we're in just uses simple dependency: version references
 
-        database_add_package(db_cursor, dependency_name, dependency_version, filename, section_name)
-        import_package_dependencies(db_cursor, dependency_name, dependency_version, dependency_json, filename, section_name)
+        package_rows.append((dependency_name, dependency_version, filename, section_name))
+        import_package_dependencies(package_rows, dependency_rows, visited, dependency_name, dependency_version, dependency_json, filename, section_name)
+
+        # Flush full batches so a streamed lock file never has all of its rows buffered at once
+        if len(package_rows) + len(dependency_rows) >= _IMPORT_BATCH_SIZE:
+            database_add_packages(db_connection, package_rows)
+            database_add_dependencies(db_connection, dependency_rows)
+            package_rows.clear()
+            dependency_rows.clear()
+
+    # Insert the remaining rows in one batch rather than one statement per node/edge
+    database_add_packages(db_connection, package_rows)
+    database_add_dependencies(db_connection, dependency_rows)
 
-def parse_package_files(package_dir: str, db_cursor: sqlite3.Cursor):
+    return item_count
+
+def parse_package_files(package_dir: str, db_connection: sqlite3.Connection):
     """
     Package.json and Package-lock.json parsing logic
     """
 
     # Verify package files exist
-    package_path = os.path.abspath(os.path.join(package_dir,'package.json'))
-    package_file = pathlib.Path(package_path)
+    package_dir_path = pathlib.Path(package_dir)
+
+    package_file = package_dir_path / 'package.json'
     if not package_file.exists():
-        raise FileNotFoundError(f"Failed to locate package configuration file {package_path}")
+        raise FileNotFoundError(f"Failed to locate package configuration file {package_file}")
 
-    package_lock_path = os.path.abspath(os.path.join(package_dir,'package-lock.json'))
-    package_lock_file = pathlib.Path(package_lock_path)
+    package_lock_file = package_dir_path / 'package-lock.json'
     if not package_lock_file.exists():
-        raise FileNotFoundError(f"Failed to locate package lock file {package_lock_path}")
+        raise FileNotFoundError(f"Failed to locate package lock file {package_lock_file}")
 
     # Load package file JSON
-    package_json = json.load(package_file.open())
-    package_lock_json = json.load(package_lock_file.open())
+    package_json = load_json_file(package_file)
+
+    # Import all sections inside a single transaction
+    with db_connection:
+        # Get package.json dependencies
+        import_json_dependency_section(db_connection, package_json, 'package.json', 'dependencies')
+        import_json_dependency_section(db_connection, package_json, 'package.json', 'devDependencies')
 
-     # Get package.json dependencies
-    import_json_dependency_section(db_cursor, package_json, 'package.json', 'dependencies')
-    import_json_dependency_section(db_cursor, package_json, 'package.json', 'devDependencies')
+        # Stream package-lock.json dependencies rather than loading the whole lock file
+        with package_lock_file.open('rb') as package_lock_stream:
+            # The stream can't tell an empty section from a missing one
+            if import_dependency_items(db_connection, ijson.kvitems(package_lock_stream, 'dependencies'), 'package-lock.json', 'dependencies') == 0:
+                print('Section \"dependencies\" empty or not found in package lock, skipping')
 
-     # Get package-lock.json dependencies
-    import_json_dependency_section(db_cursor, package_lock_json, 'package-lock.json', 'dependencies')
+    # Build indexes and planner statistics once the bulk insert is done
+    database_create_indexes(db_connection)
 
 
 ########################
 ## GraphViz functions ##
 ########################
 
+# Character substitutions applied by escape_graphviz_str
+_GV_TRANS = str.maketrans({'-': '_', '@': 'a', '/': 'f', '.': 'p'})
+
+@functools.lru_cache(maxsize=None)
 def escape_graphviz_str(input_string: str) -> str:
     """
     Replaces special characters in a string with a GraphViz friendly value
     """
 
-    for i, c in enumerate(input_string):
-        if c == '-':
-            input_string = input_string[:i] + '_' + input_string[i+1:]
-        if c == '@':
-            input_string = input_string[:i] + 'a' + input_string[i+1:]
-        if c == '/':
-            input_string = input_string[:i] + 'f' + input_string[i+1:]
-        if c == '.':
-            input_string = input_string[:i] + 'p' + input_string[i+1:]
-
-    return input_string
-
-def get_package_cluster(db_cursor: sqlite3.Cursor, cluster_name: str, label: str, styling: str = '', where_clause: str = '') -> str:
-    dot_string = f'\tsubgraph cluster_{cluster_name} {{\n'
-    dot_string += f'\t\t{styling}\n'
-    dot_string += f'\t\tlabel="{label}";\n'
-    for package in db_cursor.execute('SELECT name, GROUP_CONCAT("<p" || id || "> " || REPLACE(REPLACE(version, ">", "\>"), "<", "\<"), " | ") ' +
+    return input_string.translate(_GV_TRANS)
+
+def get_package_clusters(db_connection: sqlite3.Connection, clusters: 'dict[str, tuple[str, str]]') -> str:
+    """
+    Formats a subgraph per source file, clusters maps each file name to its cluster name and styling
+    """
+    cluster_parts: 'dict[str, list[str]]' = {}
+    for file, (cluster_name, styling) in clusters.items():
+        cluster_parts[file] = [
+            f'\tsubgraph cluster_{cluster_name} {{\n',
+            f'\t\t{styling}\n',
+            f'\t\tlabel="{file}";\n'
+        ]
+
+    # Fetch packages for every cluster in one pass, routing rows by their source file
+    file_placeholders = ', '.join('?' for _ in clusters)
+    for package in db_connection.execute('SELECT file, name, GROUP_CONCAT("<p" || id || "> " || REPLACE(REPLACE(version, ">", "\\>"), "<", "\\<"), " | ") ' +
             'FROM packages ' +
-            where_clause + ' ' +
-            'GROUP BY name'):
-        package_name = package[0]
-        package_versions = package[1]
-        dot_string += f'\t\t{escape_graphviz_str(package_name)} [label="{package_name} | {{{package_versions}}}"];\n'
-    dot_string += '\t}\n'
+            f'WHERE file IN ({file_placeholders}) ' +
+            'GROUP BY file, name ' +
+            'ORDER BY file, name', list(clusters)):
+        package_file = package[0]
+        package_name = package[1]
+        package_versions = package[2]
+        cluster_parts[package_file].append(f'\t\t{escape_graphviz_str(package_name)} [label="{package_name} | {{{package_versions}}}"];\n')
 
-    return dot_string
+    return ''.join(''.join(parts) + '\t}\n' for parts in cluster_parts.values())
 
-def output_graphviz(graphviz_output_path: str, db_cursor: sqlite3.Cursor):
+def output_graphviz(graphviz_output_path: str, db_connection: sqlite3.Connection):
     """
     Function to generate GraphViz output from database contents
     """
-    dot_string = '''digraph package_dependency_graph {
+    parts: 'list[str]' = ['''digraph package_dependency_graph {
     node [shape=record];
-    rankdir=LR;\n'''
+    rankdir=LR;\n''']
 
     # Populate nodes
-    dot_string += get_package_cluster(db_cursor, 'package_json', 'package.json', styling='style=filled;color=gold;', where_clause='WHERE file = "package.json"')
-    dot_string += get_package_cluster(db_cursor, 'package_lock_json', 'package-lock.json', where_clause='WHERE file = "package-lock.json"')
+    parts.append(get_package_clusters(db_connection, {
+        'package.json': ('package_json', 'style=filled;color=gold;'),
+        'package-lock.json': ('package_lock_json', '')
+    }))
 
     # Populate edges
-    for dependency in db_cursor.execute('SELECT "<p" || parent.id || ">", parentName, "<p" || child.id || ">", childName\n' +
+    for dependency in db_connection.execute('SELECT "<p" || parent.id || ">", parentName, "<p" || child.id || ">", childName\n' +
             'FROM dependencies\n' +
             'JOIN packages AS parent ON\n' +
                 '\tdependencies.parentName == parent.name and\n' +
@@ -204,9 +296,10 @@ def output_graphviz(graphviz_output_path: str, db_cursor: sqlite3.Cursor):
         child_id = dependency[2]
         child_node = escape_graphviz_str(dependency[3])
 
-        dot_string += f'\t"{child_node}":{child_id} -> "{parent_node}":{parent_id};\n'
+        parts.append(f'\t"{child_node}":{child_id} -> "{parent_node}":{parent_id};\n')
 
-    dot_string += "}"
+    parts.append("}")
+    dot_string = ''.join(parts)
 
     # Render graphviz
     dot = graphviz.Source(dot_string)
@@ -220,34 +313,43 @@ def output_graphviz(graphviz_output_path: str, db_cursor: sqlite3.Cursor):
 ## GraphViz (filtered) ##
 #########################
 
-def get_packages(package_names: 'list[str]', db_cursor: sqlite3.Cursor):
-    # Get starting packages
-    package_values = "'), ('".join(package_names)
-    package_sql = ('SELECT name, file, GROUP_CONCAT("<p" || id || "> " || REPLACE(REPLACE(version, ">", "\>"), "<", "\<"), " | ") ' +
-            'FROM packages ' +
-            f"WHERE name IN (VALUES ('{package_values}')) " +
-            'GROUP BY name')
-    package_select = db_cursor.execute(package_sql)
-
-    return package_select.fetchall()
-
-def format_subpackages(package_names: 'list[str]', db_cursor: sqlite3.Cursor) -> 'tuple[set[str], set[str]]':
+def format_subpackages(package_names: 'list[str]', db_connection: sqlite3.Connection) -> 'tuple[set[str], set[str]]':
     # Output strings
     package_dot_strings: 'set[str]' = set()
     dependencies_dot_strings: 'set[str]' = set()
 
-    all_packages: 'set[str]' = set()
-    current_packages = get_packages(package_names, db_cursor)
-    intersect = set(p[0] for p in current_packages) - all_packages
-
-    while any(intersect):
-        parent_dependencies: 'list[str]' = []
+    if not any(package_names):
+        return package_dot_strings, dependencies_dot_strings
+
+    # Walk up the include stack inside SQLite, returning package and dependency rows from a single query
+    package_placeholders = ', '.join('(?)' for _ in package_names)
+    subpackages_sql = ('WITH RECURSIVE reachable(name) AS (\n' +
+                f'\tVALUES {package_placeholders}\n' +
+                '\tUNION\n' +
+                '\tSELECT dependencies.parentName FROM dependencies JOIN reachable ON dependencies.childName == reachable.name\n' +
+            ')\n' +
+            'SELECT \'package\', name, file, GROUP_CONCAT("<p" || id || "> " || REPLACE(REPLACE(version, ">", "\\>"), "<", "\\<"), " | "), NULL\n' +
+            'FROM packages\n' +
+            'WHERE name IN (SELECT name FROM reachable)\n' +
+            'GROUP BY name\n' +
+            'UNION ALL\n' +
+            'SELECT \'dependency\', "<p" || parent.id || ">", parentName, "<p" || child.id || ">", childName\n' +
+            'FROM dependencies\n' +
+            'JOIN packages AS parent ON\n' +
+                '\tdependencies.parentName == parent.name and\n' +
+                '\tdependencies.parentVersion == parent.version\n' +
+            'JOIN packages AS child ON\n' +
+                '\tdependencies.childName == child.name and\n' +
+                '\tdependencies.childVersion == child.version\n' +
+            'WHERE\n' +
+                '\tdependencies.childName IN (SELECT name FROM reachable)')
 
-        for result in current_packages:
+    for result in db_connection.execute(subpackages_sql, package_names):
+        if result[0] == 'package':
             # Format package DOT string
-            package_name = result[0]
-            package_source = result[1]
-            package_versions = result[2]
+            package_name = result[1]
+            package_source = result[2]
+            package_versions = result[3]
             package_color = 'black'
 
             if package_name in package_names:
@@ -256,52 +358,33 @@ def format_subpackages(package_names: 'list[str]', db_cursor: sqlite3.Cursor) ->
                 package_color = 'gold'
 
             package_dot_strings.add(f'\t\t{escape_graphviz_str(package_name)} [label="{package_name} | {{{package_versions}}}", color={package_color}];')
+        else:
+            # Format dependency DOT string
+            parent_id = result[1]
+            parent_node = escape_graphviz_str(result[2])
+            child_id = result[3]
+            child_node = escape_graphviz_str(result[4])
 
-            # Add package dependencies to DOT
-            dependencies_sql = ('SELECT "<p" || parent.id || ">", parentName, "<p" || child.id || ">", childName\n' +
-                    'FROM dependencies\n' +
-                    'JOIN packages AS parent ON\n' +
-                        '\tdependencies.parentName == parent.name and\n' +
-                        '\tdependencies.parentVersion == parent.version\n' +
-                    'JOIN packages AS child ON\n' +
-                        '\tdependencies.childName == child.name and\n' +
-                        '\tdependencies.childVersion == child.version\n' +
-                    'WHERE\n' +
-                        f"\tdependencies.childName == '{package_name}'")
-            dependencies_select = db_cursor.execute(dependencies_sql)
-
-            for dependency in dependencies_select.fetchall():
-                # Format dependency DOT string
-                parent_id = dependency[0]
-                parent_node = escape_graphviz_str(dependency[1])
-                child_id = dependency[2]
-                child_node = escape_graphviz_str(dependency[3])
-
-                dependencies_dot_strings.add(f'\t"{child_node}":{child_id} -> "{parent_node}":{parent_id};')
-
-                parent_dependencies.append(dependency[1])
-
-        all_packages.update(intersect)
-        current_packages = get_packages(parent_dependencies, db_cursor)
-        intersect = set(p[0] for p in current_packages) - all_packages
+            dependencies_dot_strings.add(f'\t"{child_node}":{child_id} -> "{parent_node}":{parent_id};')
 
     return package_dot_strings, dependencies_dot_strings
 
-def output_filtered_graphviz(graphviz_output_path: str, package_names: 'list[str]', db_cursor: sqlite3.Cursor):
+def output_filtered_graphviz(graphviz_output_path: str, package_names: 'list[str]', db_connection: sqlite3.Connection):
     """
     Function to generate GraphViz output from database contents, only showing the include stack for package_names
     """
-    dot_string = '''digraph package_dependency_graph {
+    parts: 'list[str]' = ['''digraph package_dependency_graph {
     node [shape=record];
-    rankdir=LR;\n'''
-    
-    dot_string += get_package_cluster(db_cursor, 'package_json', 'package.json', styling='style=filled;color=gold;', where_clause='WHERE file = "package.json"')
+    rankdir=LR;\n''']
+
+    parts.append(get_package_clusters(db_connection, {'package.json': ('package_json', 'style=filled;color=gold;')}))
 
     # Populate nodes
-    results = format_subpackages(package_names, db_cursor)
-    dot_string += '\n'.join(results[0])
-    dot_string += '\n'.join(results[1])
-    dot_string += "}"
+    package_dot_strings, dependencies_dot_strings = format_subpackages(package_names, db_connection)
+    parts.extend(f'{line}\n' for line in package_dot_strings)
+    parts.extend(f'{line}\n' for line in dependencies_dot_strings)
+    parts.append("}")
+    dot_string = ''.join(parts)
 
     # Render graphviz
     dot = graphviz.Source(dot_string)
@@ -323,17 +406,15 @@ def main():
 
     print('Parsing package files...')
     db = init_database(args.outputPath)
-    db_cursor = db.cursor()
-    parse_package_files(args.packageDir, db_cursor)
-    db.commit()
+    parse_package_files(args.packageDir, db)
 
     if args.graphvizOutputPath is not None:
         print('Building GraphViz graph...')
 
         if args.graphvizPackageFilter is None:
-            output_graphviz(args.graphvizOutputPath, db_cursor)
+            output_graphviz(args.graphvizOutputPath, db)
         else:
-            output_filtered_graphviz(args.graphvizOutputPath, args.graphvizPackageFilter, db_cursor)
+            output_filtered_graphviz(args.graphvizOutputPath, args.graphvizPackageFilter, db)
 
     db.close()
 
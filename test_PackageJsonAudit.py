@@ -0,0 +1,56 @@
+# Tests for PackageJsonAudit.py
+
+import json
+
+import PackageJsonAudit
+
+def build_database(tmp_path, package_json, package_lock_json):
+    """
+    Writes package files to tmp_path and imports them into a fresh database
+    """
+    (tmp_path / 'package.json').write_text(json.dumps(package_json))
+    (tmp_path / 'package-lock.json').write_text(json.dumps(package_lock_json))
+
+    db = PackageJsonAudit.init_database(str(tmp_path / 'output' / 'audit.sqlite'))
+    PackageJsonAudit.parse_package_files(str(tmp_path), db)
+
+    return db
+
+def test_shared_package_with_different_nested_dependencies(tmp_path):
+    # x@1 is nested under both p and q, but only the copy under q has its own nested y
+    package_lock_json = {'dependencies': {
+        'p': {'version': '1', 'dependencies': {'x': {'version': '1'}}},
+        'q': {'version': '1', 'dependencies': {'x': {'version': '1', 'dependencies': {'y': {'version': '1.0.0'}}}}}
+    }}
+    db = build_database(tmp_path, {'dependencies': {'p': '1', 'q': '1'}}, package_lock_json)
+
+    packages = set(db.execute('SELECT name, version FROM packages'))
+    dependencies = set(db.execute('SELECT * FROM dependencies'))
+    db.close()
+
+    assert packages == {('p', '1'), ('q', '1'), ('x', '1'), ('y', '1.0.0')}
+    assert dependencies == {('p', '1', 'x', '1'), ('q', '1', 'x', '1'), ('x', '1', 'y', '1.0.0')}
+
+def test_format_subpackages_include_stack(tmp_path):
+    # top is reached from leaf through both a and b, other is only a child of top so is left out
+    package_lock_json = {'dependencies': {
+        'top': {'version': '1.0.0', 'requires': {'a': '1.0.0', 'b': '1.0.0', 'other': '1.0.0'}},
+        'a': {'version': '1.0.0', 'requires': {'leaf': '1.0.0'}},
+        'b': {'version': '1.0.0', 'requires': {'leaf': '1.0.0'}},
+        'leaf': {'version': '1.0.0'},
+        'other': {'version': '1.0.0'}
+    }}
+    db = build_database(tmp_path, {'dependencies': {'top': '1.0.0'}}, package_lock_json)
+    ids = dict(db.execute('SELECT name, id FROM packages'))
+
+    package_dot_strings, dependencies_dot_strings = PackageJsonAudit.format_subpackages(['leaf', 'missing'], db)
+    db.close()
+
+    assert package_dot_strings == {
+        f'\t\t{name} [label="{name} | {{<p{ids[name]}> 1.0.0}}", color={color}];'
+        for name, color in [('leaf', 'red'), ('a', 'black'), ('b', 'black'), ('top', 'gold')]
+    }
+    assert dependencies_dot_strings == {
+        f'\t"{child}":<p{ids[child]}> -> "{parent}":<p{ids[parent]}>;'
+        for parent, child in [('top', 'a'), ('top', 'b'), ('a', 'leaf'), ('b', 'leaf')]
+    }